@@ -7347,10 +7347,13 @@ C
       RETURN
       END
       SUBROUTINE interp_linear(n,ns,xs,ys,x,y,zdata,
-     .                         lst,lptr,lend,odata,edata,ierr)
-
+     .                         lst,lptr,lend,ists,odata,edata,ierr)
+C
+C ists(i) > 0 is the node at which the search for xs(i),ys(i)
+C starts, otherwise the search continues from the last point.
+C
       INTEGER n, ns, ierr
-      INTEGER lst(6*(n-2)), lptr(6*(n-2)), lend(n)
+      INTEGER lst(6*(n-2)), lptr(6*(n-2)), lend(n), ists(ns)
       REAL xs(ns), ys(ns), odata(ns)
       REAL zdata(n), x(n), y(n), z(n)
       REAL pzx, pzy
@@ -7361,6 +7364,7 @@ C
       ierr = 0
 
       DO i=1,ns
+         IF (ists(i) .gt. 0) ist = ists(i)
          CALL intrc0(xs(i),ys(i),ncc,lcc,n,x,y,zdata,lst,lptr,lend,
      .                ist,odata(i),ierr1)
 
@@ -7373,10 +7377,11 @@ C
       RETURN
       END
       SUBROUTINE interp_cubic(n,ns,xs,ys,x,y,zdata,lst,
-     .               lptr,lend,iflgs,sigma,iflgg,grad,odata,edata,ierr)
+     .               lptr,lend,iflgs,sigma,iflgg,grad,ists,odata,edata,
+     .               ierr)
 
       INTEGER n, ns, ierr
-      INTEGER lst(6*(n-2)), lptr(6*(n-2)), lend(n)
+      INTEGER lst(6*(n-2)), lptr(6*(n-2)), lend(n), ists(ns)
       REAL xs(ns), ys(ns), odata(ns)
       REAL zdata(n), x(n), y(n), z(n), sigma(6*(n-2)), grad(2,n)
       REAL pzx, pzy
@@ -7388,6 +7393,7 @@ C
       ierr = 0
 
       DO i=1,ns
+         IF (ists(i) .gt. 0) ist = ists(i)
          CALL intrc1(xs(i),ys(i),ncc,lcc,n,x,y,zdata,lst,lptr,lend,
      .                iflgs,sigma,grad,iflgg,ist,odata(i),pzx,pzy,ierr1)
 
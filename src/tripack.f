@@ -3442,9 +3442,12 @@ C
 C Modules required by STORE:  None
 C
 C***********************************************************
+C
+C Y is a local volatile (rather than a common block variable)
+C so that STORE may be called from concurrent threads.
 C
       REAL Y
-      COMMON/STCOM/Y
+      VOLATILE Y
 C
       Y = X
       STORE = Y
@@ -3760,15 +3763,14 @@ C
      .        NB, NF, NL, NP, NPP
       LOGICAL FRWRD
       REAL    B1, B2, XA, XB, XC, XP, YA, YB, YC, YP
-C
-      SAVE    IX, IY, IZ
-      DATA    IX/1/, IY/2/, IZ/3/
 C
 C Local parameters:
 C
 C B1,B2 =    Unnormalized barycentric coordinates of P with
 C              respect to (N1,N2,N3)
-C IX,IY,IZ = Integer seeds for JRAND
+C IX,IY,IZ = Integer seeds for JRAND (local rather than
+C              saved so that TRFIND may be called from
+C              concurrent threads)
 C LP =       LIST pointer
 C N0,N1,N2 = Nodes in counterclockwise order defining a
 C              cone (with vertex N0) containing P
@@ -3797,6 +3799,9 @@ C
 C
 C Initialize variables.
 C
+      IX = 1
+      IY = 2
+      IZ = 3
       XP = PX
       YP = PY
       N0 = NST
@@ -4140,7 +4140,11 @@ function nearnd ( xp, yp, ist, n, x, y, list, lptr, lend, dsq )
 
   return
 end
-subroutine nearnds ( l, xp, yp, ist, n, x, y, list, lptr, lend, dsqs, ier )
+subroutine nearnds ( l, xp, yp, ist, n, x, y, list, lptr, lend, nb, nodes, &
+  dsqs, ier )
+
+!  NODES(1:NB) are the boundary nodes of the triangulation in
+!  counterclockwise order, as returned by BNODES.
 
   implicit none
 
@@ -4154,16 +4158,15 @@ subroutine nearnds ( l, xp, yp, ist, n, x, y, list, lptr, lend, dsqs, ier )
   integer ( kind = 4 ) list(6*(n-2))
   integer ( kind = 4 ) lptr(6*(n-2))
   integer ( kind = 4 ) lend(n)
+  integer ( kind = 4 ) nb
+  integer ( kind = 4 ) nodes(nb)
   real ( kind = 8 ) dsqs(l)
   integer ( kind = 4 ) nearnd
   integer ( kind = 4 ) i
-  integer ( kind = 4 ) nn, nb, na, nt
-  integer ( kind = 4 ) nodes(n)
+  integer ( kind = 4 ) nn
   real ( kind = 8 ), allocatable :: hull_x(:), hull_y(:), vector_det(:)
   real ( kind = 8 ), allocatable :: hull_x1(:), hull_y1(:)
 
-  call bnodes( n, list, lptr, lend, nodes, nb, na, nt )
-
 
   allocate(hull_x(nb))
   allocate(hull_y(nb))
@@ -4194,6 +4197,35 @@ subroutine nearnds ( l, xp, yp, ist, n, x, y, list, lptr, lend, dsqs, ier )
 
   return
 end
+subroutine trfinds ( l, xp, yp, ist, n, x, y, list, lptr, lend, tri )
+
+!  Locate each of the L points (XP,YP) relative to the triangulation
+!  with TRFIND, starting the search for point I at node IST(I).
+!  TRI(:,I) holds the vertices of the containing triangle, or the
+!  visible boundary nodes with TRI(3,I) = 0 if the point is outside.
+
+  implicit none
+
+  integer ( kind = 4 ) l
+  real ( kind = 8 ) xp(l)
+  real ( kind = 8 ) yp(l)
+  integer ( kind = 4 ) ist(l)
+  integer ( kind = 4 ) n
+  real ( kind = 8 ) x(n)
+  real ( kind = 8 ) y(n)
+  integer ( kind = 4 ) list(6*(n-2))
+  integer ( kind = 4 ) lptr(6*(n-2))
+  integer ( kind = 4 ) lend(n)
+  integer ( kind = 4 ) tri(3,l)
+  integer ( kind = 4 ) i
+
+  do i = 1, l
+    call trfind ( ist(i), xp(i), yp(i), n, x, y, list, lptr, lend, &
+      tri(1,i), tri(2,i), tri(3,i) )
+  end do
+
+  return
+end
 subroutine optim ( x, y, na, list, lptr, lend, nit, iwk, ier )
 
 !*****************************************************************************80
@@ -4478,9 +4510,11 @@ function store ( x )
 
   real ( kind = 8 ) store
   real ( kind = 8 ) x
-  real ( kind = 8 ) y
-
-  common /stcom/ y
+!
+!  Y is a local volatile (rather than a common block variable)
+!  so that STORE may be called from concurrent threads.
+!
+  real ( kind = 8 ), volatile :: y
 
   y = x
   store = y
@@ -4928,9 +4962,9 @@ subroutine trfind ( nst, px, py, n, x, y, list, lptr, lend, i1, i2, i3 )
   integer ( kind = 4 ) i1
   integer ( kind = 4 ) i2
   integer ( kind = 4 ) i3
-  integer ( kind = 4 ), save :: ix = 1
-  integer ( kind = 4 ), save :: iy = 2
-  integer ( kind = 4 ), save :: iz = 3
+  integer ( kind = 4 ) ix
+  integer ( kind = 4 ) iy
+  integer ( kind = 4 ) iz
   integer ( kind = 4 ) jrand
   logical left
   integer ( kind = 4 ) lend(n)
@@ -4971,8 +5005,12 @@ subroutine trfind ( nst, px, py, n, x, y, list, lptr, lend, i1, i2, i3 )
 !
   frwrd(xa,ya,xb,yb,xc,yc) = (xb-xa)*(xc-xa) + (yb-ya)*(yc-ya) >= 0.0D+00
 !
-!  Initialize variables.
+!  Initialize variables.  The JRAND seeds are local rather than saved
+!  so that TRFIND may be called from concurrent threads.
 !
+  ix = 1
+  iy = 2
+  iz = 3
   xp = px
   yp = py
   n0 = nst
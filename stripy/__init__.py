@@ -70,7 +70,7 @@ def weighted_average_to_nodes(x1, x2, data, interpolator ):
 
     gridded_data = np.zeros(interpolator.npoints)
     norm         = np.zeros(interpolator.npoints)
-    count        = np.zeros(interpolator.npoints, dtype=np.int)
+    count        = np.zeros(interpolator.npoints, dtype=np.int32)
 
     bcc, nodes = interpolator.containing_simplex_and_bcc(x1, x2)
 
@@ -100,8 +100,7 @@ def remove_duplicate_points(vector_tuple):
     """
     Remove duplicates rows from N equally-sized arrays
     """
-    array = np.column_stack(vector_tuple)
-    a = np.ascontiguousarray(array)
-    unique_a = np.unique(a.view([('', a.dtype)]*a.shape[1]))
-    b = unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
-    return list(b.T)
+
+    from .cartesian import remove_duplicates
+
+    return remove_duplicates(vector_tuple)
@@ -64,6 +64,7 @@ class Triangulation(object):
             issues (see notes)
         tree : bool
             construct a cKDtree for efficient nearest-neighbour lookup
+            (this also changes the internal node ordering, see notes)
 
     Attributes:
         x : array of floats, shape (n,)
@@ -103,6 +104,16 @@ class Triangulation(object):
         they are triangulated. The distribution of triangles will
         differ between setting `permute=True` and `permute=False`,
         however, the node ordering will remain identical.
+
+        If `tree=True`, the nodes are relabelled internally into the
+        leaf order of the cKDtree once they are triangulated. As with
+        `permute=True`, `lst` and `lend` then refer to the internal
+        ordering rather than the order of x and y. The triangulation,
+        the order of the simplices and the convex hull are the same as
+        with `tree=False`, but `gradient` and `smoothing` visit the nodes
+        in a different order, so results from a small number of
+        iterations (and cubic interpolation that relies on them) differ
+        slightly. They agree once the iterations have converged.
     """
     def __init__(self, x, y, refinement_levels=0, permute=False, tree=False):
 
@@ -119,24 +130,27 @@ class Triangulation(object):
 
 
     def _generate_permutation(self, npoints):
-        i = np.arange(0, npoints)
         p = np.random.permutation(npoints)
         ip = np.empty_like(p)
-        ip[p[i]] = i
+        ip[p] = np.arange(0, npoints)
         return p, ip
 
     def _is_collinear(self, x, y):
         """
         Checks if first three points are collinear
         """
-        pts = np.column_stack([x[:3], y[:3], np.ones(3)])
-        return np.linalg.det(pts) == 0.0
+        return (x[1] - x[0])*(y[2] - y[0]) == (x[2] - x[0])*(y[1] - y[0])
 
 
     def _update_triangulation(self, x, y):
 
         npoints = len(x)
 
+        # convert the coordinates to the contiguous float64 that tripack
+        # expects up front so that f2py does not copy them on each call
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        y = np.ascontiguousarray(y, dtype=np.float64)
+
         # Deal with collinear issue
 
         if self.permute:
@@ -159,6 +173,7 @@ class Triangulation(object):
 
         self._permutation = p
         self._invpermutation = ip
+        self._identity_perm = not self.permute
 
 
         if ierr > 0:
@@ -169,18 +184,29 @@ class Triangulation(object):
         self.npoints = npoints
         self._x = x
         self._y = y
-        self._points = np.column_stack([x, y])
         self.lst = lst
         self.lptr = lptr
         self.lend = lend
 
+        ## If scipy is installed, build a KDtree to find neighbour points
+        ## (otherwise it is built on demand to seed triangle searches)
+
+        self._cKDtree = None
+        self._corners = None
+        self._segment_list = None
+        self._hull = None
+        self._vertex_triangle_map = None
+        self._ltri = None
+        self._simplex_table = None
+
         # initialise dummy array with zero tension factors
-        self._sigma = np.zeros(self.lptr.size)
+        # (single precision to match the srfpack signatures)
+        self._sigma = np.zeros(self.lptr.size, dtype=np.float32)
 
         # Convert a triangulation to a triangle list form (human readable)
         # Uses an optimised version of trlist that returns triangles
         # without neighbours or arc indices
-        nt, ltri, ierr = _tripack.trlist2(lst, lptr, lend)
+        nt, ltri, ierr = _tripack.trlist2(self.lst, self.lptr, self.lend)
 
         if ierr != 0:
             raise ValueError('ierr={} in trlist2\n{}'.format(ierr, _ier_codes[ierr]))
@@ -189,11 +215,70 @@ class Triangulation(object):
         self._simplices = ltri.T[:nt] - 1
         area = self.areas()
         self._simplices = self._simplices[area > 0.0]
+        self._corners = None
 
-        ## If scipy is installed, build a KDtree to find neighbour points
+        # boundary nodes are used by every nearest-neighbour query
+        self._convex_hull_nodes()
 
         if self.tree:
             self._build_cKDtree()
+            self._reorder_to_cKDtree()
+
+        # srfpack is compiled in single precision; keep a second copy of
+        # the coordinates in that form rather than converting on every call
+        # (the (n,2) points array is only assembled when it is requested)
+        self._x32 = self._x.astype(np.float32)
+        self._y32 = self._y.astype(np.float32)
+
+        return
+
+
+    def _reorder_to_cKDtree(self):
+        """
+        Relabel the nodes so that the internal ordering follows the
+        leaves of the cKDtree. Points that are close together are then
+        close together in memory, which keeps the gathers that follow
+        tree queries largely sequential.
+
+        Only the node labels change, the triangulation itself does not.
+        The triangle lists and the hull are taken from the original `lst`
+        and only their vertices are relabelled, so that triangles and
+        boundary nodes keep the same order as with `tree=False`.
+        """
+        if self._cKDtree is None:
+            return
+
+        # neighbour and arc columns index triangles and are left as they are
+        ltri = self._triangle_list()
+
+        p = self._cKDtree.indices
+        ip = np.empty_like(p)
+        ip[p] = np.arange(0, self.npoints)
+
+        # map from the current internal labels to the new ones
+        r = ip[self._permutation]
+
+        lst = self.lst
+        self.lst = (np.sign(lst) * (r[np.abs(lst) - 1] + 1)).astype(lst.dtype)
+
+        lend = np.empty_like(self.lend)
+        lend[r] = self.lend
+        self.lend = lend
+
+        self._simplices = r[self._simplices]
+        ltri[:,0:3] = r[ltri[:,0:3]]
+        self._hull = (r[self._hull - 1] + 1).astype(self._hull.dtype)
+
+        x = np.empty_like(self._x)
+        y = np.empty_like(self._y)
+        x[r] = self._x
+        y[r] = self._y
+        self._x = x
+        self._y = y
+
+        self._permutation = p
+        self._invpermutation = ip
+        self._identity_perm = False
 
         return
 
@@ -213,6 +298,10 @@ class Triangulation(object):
         """ Stored Cartesian xy coordinates from triangulation """
         return self._deshuffle_field(self._points)
     @property
+    def _points(self):
+        """ xy coordinates (permuted ordering) assembled from `_x` and `_y` """
+        return np.column_stack([self._x, self._y])
+    @property
     def simplices(self):
         """ Indices of the points forming the simplices in the triangulation.
         Points are ordered anticlockwise """
@@ -224,6 +313,10 @@ class Triangulation(object):
         Permute field
         """
 
+        if self._identity_perm:
+            fields = [np.asarray(arg) for arg in args]
+            return fields[0] if len(fields) == 1 else fields
+
         p = self._permutation
 
         fields = []
@@ -238,8 +331,13 @@ class Triangulation(object):
     def _deshuffle_field(self, *args):
         """
         Return to original ordering
+        (always as new arrays so that stored fields are not handed out)
         """
 
+        if self._identity_perm:
+            fields = [np.array(arg) for arg in args]
+            return fields[0] if len(fields) == 1 else fields
+
         ip = self._invpermutation
 
         fields = []
@@ -255,15 +353,22 @@ class Triangulation(object):
         """
         Permute ordering
         """
+        if self._identity_perm:
+            return np.asarray(simplices)
+
         ip = self._invpermutation
         return ip[simplices]
 
     def _deshuffle_simplices(self, simplices):
         """
         Return to original ordering
+        (always as a new array, -1 entries are kept as -1)
         """
+        if self._identity_perm:
+            return np.array(simplices, dtype=self._permutation.dtype)
+
         p = self._permutation
-        return p[simplices]
+        return np.where(np.less(simplices, 0), -1, p[simplices])
 
 
     def _check_gradient(self, zdata, grad, **kwargs):
@@ -281,11 +386,10 @@ class Triangulation(object):
         iflgg = False
 
         if grad is None:
-            grad = np.vstack(self.gradient(zdata, **kwargs))
-            grad = grad[:,p]
+            grad = self._gradient(self._shuffle_field(zdata), **kwargs)
 
         elif grad.shape == (2,self.npoints):
-            grad = grad[:,p] # permute
+            grad = np.asfortranarray(grad[:,p], dtype=np.float32) # permute
 
         else:
             raise ValueError("gradient should be 'None' or of shape (2,n).")
@@ -302,6 +406,7 @@ class Triangulation(object):
             sigma = self._sigma
         else:
             assert len(sigma) == 6*self.npoints-12, "sigma must be of length 6n-12"
+            sigma = np.asarray(sigma, dtype=np.float32)
             iflgs = int(np.any(sigma))
 
         return sigma, iflgs
@@ -362,7 +467,7 @@ class Triangulation(object):
         zdata = self._shuffle_field(zdata)
 
 
-        sigma, dsmax, ierr = _srfpack.getsig(self._x, self._y, zdata,\
+        sigma, dsmax, ierr = _srfpack.getsig(self._x32, self._y32, zdata,\
                                              self.lst, self.lptr, self.lend,\
                                              grad, tol)
 
@@ -418,14 +523,26 @@ class Triangulation(object):
         if f.size != self.npoints:
             raise ValueError('f should be the same size as mesh')
 
+        f = self._shuffle_field(f)
+        gradient = self._gradient(f, nit, tol, guarantee_convergence, sigma)
+
+        # rows of the Fortran-ordered (2,n) array are strided views
+        dfdx, dfdy = self._deshuffle_field(gradient[0], gradient[1])
+
+        return np.ascontiguousarray(dfdx), np.ascontiguousarray(dfdy)
+
+    def _gradient(self, f, nit=3, tol=1e-3, guarantee_convergence=False, sigma=None):
+        """
+        Gradient of the permuted field `f` returned as the (2,n) float32,
+        Fortran-ordered array that the srfpack routines take as `grad`,
+        so that it can be passed on without a copy.
+        """
         gradient = np.zeros((2,self.npoints), order='F', dtype=np.float32)
         sigma, iflgs = self._check_sigma(sigma)
 
-        f = self._shuffle_field(f)
-
         ierr = 1
         while ierr == 1:
-            ierr = _srfpack.gradg(self._x, self._y, f, self.lst, self.lptr, self.lend,\
+            ierr = _srfpack.gradg(self._x32, self._y32, f, self.lst, self.lptr, self.lend,\
                                   iflgs, sigma, gradient, nit=nit, dgmax=tol)
             if not guarantee_convergence:
                 break
@@ -433,7 +550,7 @@ class Triangulation(object):
         if ierr < 0:
             raise ValueError('ierr={} in gradg\n{}'.format(ierr, _ier_codes[ierr]))
 
-        return self._deshuffle_field(gradient[0], gradient[1])
+        return gradient
 
     def second_gradient_local(self, f, index):
         """
@@ -484,7 +601,7 @@ class Triangulation(object):
         # subroutine gradc(k,ncc,lcc,n,x,y,z,list,lptr,lend,dx,dy,dxx,dxy,dyy,ier) ! in :_srfpack:srfpack.f
         # subroutine gradg(  ncc,lcc,n,x,y,z,list,lptr,lend,iflgs,sigma,nit,dgmax,grad,ier) ! in :_srfpack:srfpack.f
 
-        dx, dy, dxx, dxy, dyy, ierr = _srfpack.gradcs(index+1, self._x, self._y, f, self.lst, self.lptr, self.lend)
+        dx, dy, dxx, dxy, dyy, ierr = _srfpack.gradcs(index+1, self._x32, self._y32, f, self.lst, self.lptr, self.lend)
     
         if ierr < 0:
             raise ValueError('ierr={} in gradc\n{}'.format(ierr, _ier_codes[ierr]))
@@ -509,7 +626,7 @@ class Triangulation(object):
         f = self._shuffle_field(f)
         index = self._shuffle_simplices(index)
 
-        gradX, gradY, l = _srfpack.gradls(index + 1, self._x, self._y, f,\
+        gradX, gradY, l = _srfpack.gradls(index + 1, self._x32, self._y32, f,\
                                          self.lst, self.lptr, self.lend)
 
         return gradX, gradY
@@ -557,7 +674,7 @@ class Triangulation(object):
         f, w = self._shuffle_field(f, w)
         sigma, iflgs = self._check_sigma(sigma)
 
-        f_smooth, df, ierr = _srfpack.smsurf(self._x, self._y, f, self.lst, self.lptr, self.lend,\
+        f_smooth, df, ierr = _srfpack.smsurf(self._x32, self._y32, f, self.lst, self.lptr, self.lend,\
                                              iflgs, sigma, w, sm, smtol, gstol)
 
         import warnings
@@ -623,7 +740,7 @@ class Triangulation(object):
         lcc = 0
         nrow = len(xi)
 
-        ff, ierr = _srfpack.unif(ncc, lcc, self._x, self._y, zdata, grad,\
+        ff, ierr = _srfpack.unif(ncc, lcc, self._x32, self._y32, zdata, grad,\
                                  self.lst, self.lptr, self.lend,\
                                  iflgs, sigma, nrow, xi, yi,\
                                  sflag, sval)
@@ -662,35 +779,47 @@ class Triangulation(object):
                 interpolates value(s) at (xi, yi)
             err : int / array of ints, shape (l,)
                 whether interpolation (0), extrapolation (1) or error (other)
+
+        Notes:
+            The Fortran interpolation routines release the GIL, so large
+            batches of points can be split and interpolated concurrently
+            (e.g. with `concurrent.futures.ThreadPoolExecutor`). Supply `grad`
+            for cubic interpolation so that it is not recomputed by each thread.
         """
         shape = np.shape(xi)
 
         if zdata.size != self.npoints:
             raise ValueError('zdata should be same size as mesh')
 
+        xi = np.array(xi).reshape(-1)
+        yi = np.array(yi).reshape(-1)
+
+        # starting nodes for the search at each point
+        ist = self._seed_ist(xi, yi)
+
         if order == 0:
             ierr = 0
-            ist = np.ones(shape, dtype=np.int)
             zdata = self._shuffle_field(zdata)
             ist, dist, zierr = _tripack.nearnds(xi, yi, ist, \
                                                 self._x, self._y, \
-                                                self.lst, self.lptr, self.lend)
+                                                self.lst, self.lptr, self.lend, \
+                                                self._convex_hull_nodes())
             zi = zdata[ist - 1]
 
         elif order == 1:
             zdata = self._shuffle_field(zdata)
             zi, zierr, ierr = _srfpack.interp_linear(xi, yi,\
-                                                self._x,self._y, zdata, \
-                                                self.lst, self.lptr, self.lend)
+                                                self._x32, self._y32, zdata, \
+                                                self.lst, self.lptr, self.lend, ist)
         elif order == 3:
             sigma, iflgs = self._check_sigma(sigma)
             grad, iflgg = self._check_gradient(zdata, grad)
             zdata = self._shuffle_field(zdata)
 
             zi, zierr, ierr = _srfpack.interp_cubic(xi, yi, \
-                                                    self._x, self._y, zdata, \
+                                                    self._x32, self._y32, zdata, \
                                                     self.lst,self.lptr,self.lend,\
-                                                    iflgs, sigma, iflgg, grad)
+                                                    iflgs, sigma, iflgg, grad, ist)
         else:
             raise ValueError("order must be 0, 1, or 3")
 
@@ -730,10 +859,7 @@ class Triangulation(object):
         The kth neighbour is opposite to the kth vertex.
         For simplices at the boundary, -1 denotes no neighbour.
         """
-        nt, ltri, lct, ierr = _tripack.trlist(self.lst, self.lptr, self.lend, nrow=6)
-        if ierr != 0:
-            raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
-        return ltri.T[:nt,3:] - 1
+        return self._triangle_list()[:,3:6].copy()
 
 
     def neighbour_and_arc_simplices(self):
@@ -742,11 +868,23 @@ class Triangulation(object):
         Identical to get_neighbour_simplices() but also returns an array
         of indices that reside on boundary hull, -1 denotes no neighbour.
         """
-        nt, ltri, lct, ierr = _tripack.trlist(self.lst, self.lptr, self.lend, nrow=9)
-        if ierr != 0:
-            raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
-        ltri = ltri.T[:nt] - 1
-        return ltri[:,3:6], ltri[:,6:]
+        ltri = self._triangle_list()
+        return ltri[:,3:6].copy(), ltri[:,6:].copy()
+
+
+    def _triangle_list(self):
+        """
+        Zero-based triangle list from trlist with vertices, neighbour
+        simplices and arc indices in each row (nrow=9).
+        This is cached until the triangulation is updated.
+        """
+        if self._ltri is None:
+            nt, ltri, lct, ierr = _tripack.trlist(self.lst, self.lptr, self.lend, nrow=9)
+            if ierr != 0:
+                raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
+            self._ltri = ltri.T[:nt] - 1
+
+        return self._ltri
 
 
     def nearest_vertex(self, xi, yi):
@@ -776,16 +914,12 @@ class Triangulation(object):
         xi = np.array(xi).reshape(n)
         yi = np.array(yi).reshape(n)
 
-        idx  = np.empty_like(xi, dtype=np.int)
-        dist = np.empty_like(xi, dtype=np.float)
-
-        for pt in range(0, n):
-            # i is the node at which we start the search
-            # the closest x coordinate is a good place
-            i = np.abs(self._x - xi[pt]).argmin()
+        # ist is the node at which we start the search at each point
+        ist = self._seed_ist(xi, yi)
 
-            idx[pt], dist[pt] = _tripack.nearnd(xi[pt], yi[pt], i, self._x, self._y,\
-                                                self.lst, self.lptr, self.lend)
+        idx, dist, ierr = _tripack.nearnds(xi, yi, ist, self._x, self._y,\
+                                           self.lst, self.lptr, self.lend,\
+                                           self._convex_hull_nodes())
         idx -= 1 # return to C ordering
 
         return self._deshuffle_simplices(idx), dist
@@ -803,23 +937,45 @@ class Triangulation(object):
 
         Returns:
             tri_indices: array of ints, shape (l,)
+                -1 denotes a point outside the triangulation
 
         Notes:
             The simplices are found as `cartesian.Triangulation.simplices[tri_indices]`
         """
-        p = self._permutation
-        pts = np.column_stack([xi, yi])
+        xi = np.ravel(xi).astype(np.float64)
+        yi = np.ravel(yi).astype(np.float64)
+        ist = self._seed_ist(xi, yi)
 
-        sorted_simplices = np.sort(self._simplices, axis=1)
+        tri = _tripack.trfinds(xi, yi, ist, self._x, self._y, self.lst, self.lptr, self.lend)
 
-        triangles = []
-        for pt in pts:
-            t = _tripack.trfind(3, pt[0], pt[1], self._x, self._y, self.lst, self.lptr, self.lend)
-            tri = np.sort(t) - 1
+        return self._simplex_lookup(tri.T - 1)
 
-            triangles.extend(np.where(np.all(p[sorted_simplices]==p[tri], axis=1))[0])
 
-        return np.array(triangles).ravel()
+    def _simplex_lookup(self, tri):
+        """
+        Returns the index in `self.simplices` of each (permuted, zero-based)
+        anticlockwise vertex triple in `tri`, or -1 where the triple is not a simplex.
+
+        Each directed edge belongs to at most one simplex, so the simplices
+        are keyed on the packed edges around them and matched on the third
+        vertex. The sorted keys are cached until the triangulation is updated.
+        """
+        if self._simplex_table is None:
+            s = self._simplices
+            keys = np.concatenate([_edge_keys(s[:,0], s[:,1]),
+                                   _edge_keys(s[:,1], s[:,2]),
+                                   _edge_keys(s[:,2], s[:,0])])
+            third = np.concatenate([s[:,2], s[:,0], s[:,1]])
+            order = np.argsort(keys)
+            self._simplex_table = (keys[order], third[order], order % s.shape[0])
+
+        keys, third, index = self._simplex_table
+
+        query = _edge_keys(tri[:,0], tri[:,1])
+        loc = np.searchsorted(keys, query).clip(max=keys.size-1)
+        found = (keys[loc] == query) & (third[loc] == tri[:,2])
+
+        return np.where(found, index[loc], -1)
 
 
     def containing_simplex_and_bcc(self, xi, yi):
@@ -840,38 +996,40 @@ class Triangulation(object):
         Notes:
             The ordering of the vertices may differ from that stored in
             `self.simplices` array but will still be a loop around the simplex.
+            For points outside the triangulation the third vertex is -1
+            and the barycentric coordinates are zero.
         """
 
-        pts = np.column_stack([xi,yi])
-
-        tri = np.empty((pts.shape[0], 3), dtype=np.int) # simplices
-        bcc = np.empty_like(tri, dtype=np.float) # barycentric coords
+        pts = np.column_stack([xi,yi]).astype(np.float64)
+        ist = self._seed_ist(pts[:,0], pts[:,1])
 
-        for i, pt in enumerate(pts):
-            t = _tripack.trfind(3, pt[0], pt[1], self._x, self._y, self.lst, self.lptr, self.lend)
-            tri[i] = t
+        tri = _tripack.trfinds(pts[:,0], pts[:,1], ist, self._x, self._y, self.lst, self.lptr, self.lend)
+        tri = tri.T - 1 # simplices, return to C ordering
 
-            vert = self._points[tri[i] - 1]
-            v0 = vert[1] - vert[0]
-            v1 = vert[2] - vert[0]
-            v2 = pt - vert[0]
+        # barycentric coords from the (l,3,2) vertices of every simplex
+        # (points outside the triangulation have no third vertex, bcc = 0)
+        inside = tri[:,2] >= 0
+        vert = np.stack([self._x[tri[inside]], self._y[tri[inside]]], axis=-1)
+        v0 = vert[:,1] - vert[:,0]
+        v1 = vert[:,2] - vert[:,0]
+        v2 = pts[inside] - vert[:,0]
 
-            d00 = v0.dot(v0)
-            d01 = v0.dot(v1)
-            d11 = v1.dot(v1)
-            d20 = v2.dot(v0)
-            d21 = v2.dot(v1)
-            denom = d00*d11 - d01*d01
+        d00 = np.einsum('ij,ij->i', v0, v0)
+        d01 = np.einsum('ij,ij->i', v0, v1)
+        d11 = np.einsum('ij,ij->i', v1, v1)
+        d20 = np.einsum('ij,ij->i', v2, v0)
+        d21 = np.einsum('ij,ij->i', v2, v1)
+        denom = d00*d11 - d01*d01
 
-            v = (d11 * d20 - d01 * d21) / denom
-            w = (d00 * d21 - d01 * d20) / denom
-            u = 1.0 - v - w
+        b = np.empty((vert.shape[0], 3))
+        b[:,1] = (d11 * d20 - d01 * d21) / denom
+        b[:,2] = (d00 * d21 - d01 * d20) / denom
+        b[:,0] = 1.0 - b[:,1] - b[:,2]
 
-            bcc[i] = [u, v, w]
+        b /= b.sum(axis=1).reshape(-1,1)
 
-        tri -= 1 # return to C ordering
-
-        bcc /= bcc.sum(axis=1).reshape(-1,1)
+        bcc = np.zeros(tri.shape)
+        bcc[inside] = b
 
         return bcc, self._deshuffle_simplices(tri)
 
@@ -881,9 +1039,9 @@ class Triangulation(object):
         Find the neighbour-vertices in the triangulation for the given vertex
         Searches `self.simplices` for vertex entries and sorts neighbours
         """
-        simplices = self.simplices
-        ridx, cidx = np.where(simplices == vertex)
-        neighbour_array = np.unique(np.hstack([simplices[ridx]])).tolist()
+        indptr, indices = self._vertex_triangles()
+        ridx = indices[indptr[vertex]:indptr[vertex+1]]
+        neighbour_array = np.unique(self._deshuffle_simplices(self._simplices[ridx])).tolist()
         neighbour_array.remove(vertex)
         return neighbour_array
 
@@ -896,30 +1054,66 @@ class Triangulation(object):
 
         triangles = []
 
+        indptr, indices = self._vertex_triangles()
+
         for vertex in np.array(vertices).reshape(-1):
-            triangles.append(np.where(self.simplices == vertex)[0])
+            triangles.append(indices[indptr[vertex]:indptr[vertex+1]])
 
         return np.unique(np.concatenate(triangles))
 
 
+    def _vertex_triangles(self):
+        """
+        Inverted index of the triangles that own each vertex, stored in
+        compressed (indptr, indices) form so that the triangles of `vertex`
+        are `indices[indptr[vertex]:indptr[vertex+1]]`.
+        This is cached until the triangulation is updated.
+        """
+        if self._vertex_triangle_map is None:
+            flat = self.simplices.ravel()
+
+            indptr = np.zeros(self.npoints+1, dtype=np.int64)
+            indptr[1:] = np.cumsum(np.bincount(flat, minlength=self.npoints))
+            indices = np.argsort(flat, kind='stable') // 3
+
+            self._vertex_triangle_map = (indptr, indices)
+
+        return self._vertex_triangle_map
+
+
     def identify_segments(self):
         """
         Find all the segments in the triangulation and return an
         array of vertices (n1,n2) where n1 < n2
+        (a new array each time, the cached list is read-only)
         """
+        segments = self._deshuffle_simplices(self._segments())
+
+        # relabelled vertex pairs are no longer in increasing order
+        if not self._identity_perm:
+            segments.sort(axis=1)
+            segments = segments[np.lexsort((segments[:,1], segments[:,0]))]
 
-        i1 = np.sort([self._simplices[:,0], self._simplices[:,1]], axis=0)
-        i2 = np.sort([self._simplices[:,0], self._simplices[:,2]], axis=0)
-        i3 = np.sort([self._simplices[:,1], self._simplices[:,2]], axis=0)
+        return segments
 
-        a = np.hstack([i1, i2, i3]).T
 
-        # find unique rows in numpy array
-        # <http://stackoverflow.com/questions/16970982/find-unique-rows-in-numpy-array>
-        b = np.ascontiguousarray(a).view(np.dtype((np.void, a.dtype.itemsize * a.shape[1])))
-        segments = np.unique(b).view(a.dtype).reshape(-1, a.shape[1])
+    def _segments(self):
+        """
+        Segments (zero-based, permuted ordering) of the triangulation.
+        These are cached, read-only, until the triangulation is updated.
+        """
+        if self._segment_list is not None:
+            return self._segment_list
 
-        return self._deshuffle_simplices(segments)
+        s = np.sort(self._simplices, axis=1)
+
+        segments = _unique_edges(np.concatenate([s[:,0], s[:,0], s[:,1]]),
+                                 np.concatenate([s[:,1], s[:,2], s[:,2]]))
+
+        segments.flags.writeable = False
+        self._segment_list = segments
+
+        return segments
 
 
     def segment_midpoints_by_vertices(self, vertices):
@@ -928,13 +1122,15 @@ class Triangulation(object):
         list / array provided.
         """
 
-        segments = set()
+        n1 = []
+        n2 = []
 
         for vertex in vertices:
-            neighbours = self.identify_vertex_neighbours(vertex)
-            segments.update( min( tuple((vertex, n1)), tuple((n1, vertex))) for n1 in neighbours )
+            neighbours = np.array(self.identify_vertex_neighbours(vertex), dtype=np.int64)
+            n1.append(np.minimum(vertex, neighbours))
+            n2.append(np.maximum(vertex, neighbours))
 
-        segs = np.array(list(segments))
+        segs = _unique_edges(np.concatenate(n1), np.concatenate(n2))
 
         new_midpoints = self.segment_midpoints(segments=segs)
 
@@ -947,11 +1143,15 @@ class Triangulation(object):
         simplices is given then the centroids of only those simplices is returned.
         """
 
-        if type(simplices) == type(None):
-            simplices = self.simplices
+        if simplices is None:
+            xt, yt = self._simplex_corners()
+        else:
+            simplices = self._shuffle_simplices(simplices)
+            xt = self._x[simplices]
+            yt = self._y[simplices]
 
-        mids = self.points[simplices].mean(axis=1)
-        mid_xpt, mid_ypt = mids[:,0], mids[:,1]
+        mid_xpt = xt.mean(axis=1)
+        mid_ypt = yt.mean(axis=1)
 
         return mid_xpt, mid_ypt
 
@@ -967,29 +1167,49 @@ class Triangulation(object):
             will fail. Take care not to miss that (n1,n2) is equivalent to (n2,n1).
         """
 
-        if type(segments) == type(None):
-            segments = self.identify_segments()
-        points = self.points
+        if segments is None:
+            segments = self._segments()
+        else:
+            segments = self._shuffle_simplices(segments)
 
-        mids = (points[segments[:,0]] + points[segments[:,1]]) * 0.5
-        mid_xpt, mid_ypt = mids[:,0], mids[:,1]
+        # x and y are reduced separately so that each is returned
+        # as a contiguous array rather than a strided column view
+        mid_xpt = self._x[segments].mean(axis=1)
+        mid_ypt = self._y[segments].mean(axis=1)
 
         return mid_xpt, mid_ypt
 
 
-    def segment_tripoints(self, ratio=0.33333):
+    def segment_tripoints(self, ratio=0.33333, which='both'):
         """
         Identify the trisection points of every line segment in the triangulation
+
+        Args:
+            ratio : float (default: 0.33333)
+                fraction of the segment length at which the points are placed
+            which : str (default: 'both')
+                'near' for the point nearer the first vertex of each segment,
+                'far' for the point nearer the second vertex, or 'both' to
+                return the 'far' points followed by the 'near' points
         """
 
-        segments = self.identify_segments()
-        points = self.points
+        weights = _trisection_weights(ratio, which)
 
-        mids1 = ratio*points[segments[:,0]] + (1.0-ratio)*points[segments[:,1]]
-        mids2 = (1.0-ratio)*points[segments[:,0]] + ratio*points[segments[:,1]]
+        # segments are oriented as in identify_segments
+        segments = self._shuffle_simplices(self.identify_segments())
+        n = segments.shape[0]
 
-        mids = np.vstack((mids1,mids2))
-        mid_xpt, mid_ypt = mids[:,0], mids[:,1]
+        # write the requested trisection points of each segment into
+        # one contiguous buffer per coordinate
+        mid_xpt = np.empty(len(weights)*n)
+        mid_ypt = np.empty(len(weights)*n)
+
+        for mids, field in ((mid_xpt, self._x), (mid_ypt, self._y)):
+            ends = field[segments]
+            for i, (w0, w1) in enumerate(weights):
+                out = mids[i*n:(i+1)*n]
+                np.multiply(ends[:,0], w0, out=out)
+                out += w1*ends[:,1]
 
         return mid_xpt, mid_ypt
 
@@ -1002,8 +1222,33 @@ class Triangulation(object):
             bnodes : array of ints
                 indices corresponding to points on the convex hull
         """
-        bnodes, nb, na, nt = _tripack.bnodes(self.lst, self.lptr, self.lend, self.npoints)
-        return self._deshuffle_simplices(bnodes[:nb] - 1)
+        return self._deshuffle_simplices(self._convex_hull_nodes() - 1)
+
+
+    def _convex_hull_nodes(self):
+        """
+        Boundary nodes (1-based, permuted ordering) in counterclockwise
+        order. These are found when the triangulation is built and
+        cached until it is updated.
+        """
+        if self._hull is None:
+            bnodes, nb, na, nt = _tripack.bnodes(self.lst, self.lptr, self.lend, self.npoints)
+            self._hull = bnodes[:nb]
+
+        return self._hull
+
+
+    def _simplex_corners(self):
+        """
+        x and y coordinates of the corners of every simplex as two
+        (nt,3) arrays. Gathering these is the bulk of the work for the
+        per-triangle geometry, so they are cached until the
+        triangulation is updated.
+        """
+        if self._corners is None:
+            self._corners = (self._x[self._simplices], self._y[self._simplices])
+
+        return self._corners
 
 
     def areas(self):
@@ -1016,10 +1261,17 @@ class Triangulation(object):
                 is the number of triangles.
 
         """
-        v1 = self.points[self.simplices[:,1]] - self.points[self.simplices[:,0]]
-        v2 = self.points[self.simplices[:,2]] - self.points[self.simplices[:,1]]
+        xt, yt = self._simplex_corners()
+
+        # 2D cross product of the edges v1 = p1 - p0, v2 = p2 - p1
+        # evaluated in place to keep the number of temporaries down
+        area = xt[:,1] - xt[:,0]
+        area *= yt[:,2] - yt[:,1]
+        cross = yt[:,1] - yt[:,0]
+        cross *= xt[:,2] - xt[:,1]
+        area -= cross
+        area *= 0.5
 
-        area = 0.5*(v1[:,0]*v2[:,1] - v1[:,1]*v2[:,0])
         return area
 
 
@@ -1027,36 +1279,48 @@ class Triangulation(object):
         """
         Compute the edge-lengths of each triangle in the triangulation.
         """
-        simplex = self.simplices.T
+        xt, yt = self._simplex_corners()
 
-        # simplex is vectors a, b, c defining the corners
-        a = self.points[simplex[0]]
-        b = self.points[simplex[1]]
-        c = self.points[simplex[2]]
+        # edge vectors b-a, c-b, a-c and their lengths
+        dx = xt[:,[1,2,0]] - xt
+        dy = yt[:,[1,2,0]] - yt
+        lengths = np.sqrt(dx*dx + dy*dy)
 
-        # norm to calculate length
-        ab = np.linalg.norm(b - a, axis=1)
-        bc = np.linalg.norm(c - a, axis=1)
-        ac = np.linalg.norm(a - c, axis=1)
+        return lengths[:,0], lengths[:,1], lengths[:,2]
 
-        return ab, bc, ac
 
+    def _append_points(self, xi, yi):
+        """
+        Returns the x, y coordinates of the mesh (original ordering)
+        followed by `xi`, `yi`. Each is written straight into a single
+        preallocated array rather than deshuffled and concatenated.
+        """
+        n = self.npoints
+        x_v1 = np.empty(n + np.size(xi))
+        y_v1 = np.empty(n + np.size(yi))
+
+        for out, field, new in ((x_v1, self._x, xi), (y_v1, self._y, yi)):
+            if self._identity_perm:
+                out[:n] = field
+            else:
+                np.take(field, self._invpermutation, out=out[:n])
+            out[n:] = np.ravel(new)
+
+        return x_v1, y_v1
 
     def _add_midpoints(self):
 
         mid_xpt, mid_ypt = self.segment_midpoints()
 
-        x_v2 = np.concatenate([self.x, mid_xpt], axis=0)
-        y_v2 = np.concatenate([self.y, mid_ypt], axis=0)
+        x_v2, y_v2 = self._append_points(mid_xpt, mid_ypt)
 
         return x_v2, y_v2
 
-    def _add_tripoints(self, ratio=0.333333):
+    def _add_tripoints(self, ratio=0.333333, which='both'):
 
-        mid_xpt, mid_ypt = self.segment_tripoints()
+        mid_xpt, mid_ypt = self.segment_tripoints(ratio=ratio, which=which)
 
-        x_v2 = np.concatenate([self.x, mid_xpt], axis=0)
-        y_v2 = np.concatenate([self.y, mid_ypt], axis=0)
+        x_v2, y_v2 = self._append_points(mid_xpt, mid_ypt)
 
         return x_v2, y_v2
 
@@ -1064,8 +1328,7 @@ class Triangulation(object):
 
         face_xpt, face_ypt = self.face_midpoints()
 
-        x_v2 = np.concatenate((self.x, face_xpt), axis=0)
-        y_v2 = np.concatenate((self.y, face_ypt), axis=0)
+        x_v2, y_v2 = self._append_points(face_xpt, face_ypt)
 
         return x_v2, y_v2
 
@@ -1096,8 +1359,7 @@ class Triangulation(object):
 
         xi, yi = self.segment_midpoints_by_vertices(vertices=vertices)
 
-        x_v1 = np.concatenate((self.x, xi), axis=0)
-        y_v1 = np.concatenate((self.y, yi), axis=0)
+        x_v1, y_v1 = self._append_points(xi, yi)
 
         return x_v1, y_v1
 
@@ -1119,21 +1381,14 @@ class Triangulation(object):
 
         # identify the segments
 
-        simplices = self.simplices
-        segments = set()
-
-        for index in np.array(triangles).reshape(-1):
-            tri = simplices[index]
-            segments.add( min( tuple((tri[0], tri[1])), tuple((tri[0], tri[1]))) )
-            segments.add( min( tuple((tri[1], tri[2])), tuple((tri[2], tri[1]))) )
-            segments.add( min( tuple((tri[0], tri[2])), tuple((tri[2], tri[0]))) )
+        tri = np.sort(self.simplices[np.array(triangles).reshape(-1)], axis=1)
 
-        segs = np.array(list(segments))
+        segs = _unique_edges(np.concatenate([tri[:,0], tri[:,1], tri[:,0]]),
+                             np.concatenate([tri[:,1], tri[:,2], tri[:,2]]))
 
         xi, yi = self.segment_midpoints(segs)
 
-        x_v1 = np.concatenate((self.x, xi), axis=0)
-        y_v1 = np.concatenate((self.y, yi), axis=0)
+        x_v1, y_v1 = self._append_points(xi, yi)
 
         return x_v1, y_v1
 
@@ -1165,8 +1420,7 @@ class Triangulation(object):
 
         xi, yi = self.face_midpoints(simplices=self.simplices[triangles])
 
-        x_v1 = np.concatenate((self.x, xi), axis=0)
-        y_v1 = np.concatenate((self.y, yi), axis=0)
+        x_v1, y_v1 = self._append_points(xi, yi)
 
         return x_v1, y_v1
 
@@ -1182,24 +1436,25 @@ class Triangulation(object):
         return self.centroid_refine_triangulation_by_triangles(triangles)
 
 
-    def join(self, t2, unique=False):
+    def join(self, t2, unique=None):
         """
-        Join this triangulation with another. If the points are known to have no duplicates, then
-        set unique=False to skip the testing and duplicate removal
+        Join this triangulation with another. By default the points are assumed to have
+        no duplicates (unique=True) and are not tested. Set unique=False to find and
+        remove any duplicate points.
         """
+        if unique is None:
+            import warnings
+            message = "join no longer removes duplicate points by default"
+            message += "\npass unique=False if the two point sets may overlap"
+            warnings.warn(message, FutureWarning, stacklevel=2)
+            unique = True
 
-        x_v1 = np.concatenate((self.x, t2.x), axis=0)
-        y_v1 = np.concatenate((self.y, t2.y), axis=0)
+        x_v1, y_v1 = self._append_points(t2.x, t2.y)
 
         ## remove any duplicates
 
         if not unique:
-            a = np.ascontiguousarray(np.vstack((x_v1, y_v1)).T)
-            unique_a = np.unique(a.view([('', a.dtype)]*a.shape[1]))
-            unique_coords = unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
-
-            x_v1 = unique_coords[:,0]
-            y_v1 = unique_coords[:,1]
+            x_v1, y_v1 = remove_duplicates((x_v1, y_v1))
 
         return x_v1, y_v1
 
@@ -1207,11 +1462,41 @@ class Triangulation(object):
     def _build_cKDtree(self):
 
         try:
+            import scipy
             import scipy.spatial
-            self._cKDtree = scipy.spatial.cKDTree(self.points)
+            self._cKDtree = scipy.spatial.cKDTree(self.points, leafsize=16,
+                                                 balanced_tree=True, compact_nodes=True)
 
         except:
             self._cKDtree = None
+            return
+
+        # queries run on every core
+        self._cKDtree_query_kwargs = _cKDtree_query_kwargs(scipy.__version__)
+
+
+    def _seed_ist(self, xi, yi):
+        """
+        Starting nodes (1-based, permuted ordering) for the Fortran
+        triangle searches at each of the points (xi, yi).
+
+        The nearest vertex to each point is found with a single query
+        of the cKDtree, which is built on demand if `tree=False`.
+        If scipy is not available, every search starts from the first node.
+        """
+        if self._cKDtree is None:
+            self._build_cKDtree()
+
+        if self._cKDtree is None:
+            return np.ones(np.size(xi), dtype=np.int32)
+
+        xy = np.empty((np.size(xi), 2))
+        xy[:,0] = xi
+        xy[:,1] = yi
+
+        d, vertices = self._cKDtree.query(xy, **self._cKDtree_query_kwargs)
+
+        return self._shuffle_simplices(vertices).astype(np.int32) + 1
 
 
     def nearest_vertices(self, x, y, k=1, max_distance=np.inf ):
@@ -1238,12 +1523,16 @@ class Triangulation(object):
                 vertices of the nearest neighbour(s)
         """
 
-        if self.tree == False or self.tree == None:
+        if not self.tree:
             return 0, 0
 
-        xy = np.column_stack([x, y])
+        # row-major query buffer in the float64 that cKDTree works in
+        xy = np.empty((np.size(x), 2))
+        xy[:,0] = np.ravel(x)
+        xy[:,1] = np.ravel(y)
 
-        dxy, vertices = self._cKDtree.query(xy, k=k, distance_upper_bound=max_distance)
+        dxy, vertices = self._cKDtree.query(xy, k=k, distance_upper_bound=max_distance,
+                                            **self._cKDtree_query_kwargs)
 
 
         if k == 1:   # force this to be a 2D array
@@ -1283,11 +1572,8 @@ class Triangulation(object):
                 inscribed circle in the range [0,0.5] with 0 if `sa=0`
                 and `sa=0.5` if the vertices form an equilateral triangle
         """
-        simplices = self.simplices
-
         # get x,y coordinates of each triangle
-        xt = self.x[simplices]
-        yt = self.y[simplices]
+        xt, yt = self._simplex_corners()
 
         # get coordinate vectors
         u = np.empty_like(xt)
@@ -1377,12 +1663,74 @@ class Triangulation(object):
         return vx, vy, voronoi_regions
 
 
+def _edge_keys(n1, n2):
+    """
+    Pack each edge (n1,n2) into a single int64 key
+    """
+    return (np.asarray(n1, dtype=np.int64) << 32) | n2
+
+
+def _unique_edges(n1, n2):
+    """
+    Unique edges (n1,n2), where n1 < n2, as a sorted (k,2) array.
+    Each edge is packed into a single int64 key so that the
+    duplicates are removed with a 1D sort.
+    """
+    key = np.unique(_edge_keys(n1, n2))
+
+    edges = np.empty((key.size, 2), dtype=np.int64)
+    edges[:,0] = key >> 32
+    edges[:,1] = key & 0xFFFFFFFF
+
+    return edges
+
+
+def _cKDtree_query_kwargs(scipy_version):
+    """
+    Keyword arguments that run cKDTree queries on every core
+    ('n_jobs' became 'workers' in scipy 1.6)
+    """
+    import re
+
+    # only the leading digits of each component are compared,
+    # an unrecognised version string is taken to be recent
+    version = tuple(int(v) for v in re.findall(r'\d+', scipy_version)[:2])
+
+    if version and version < (1, 6):
+        return {'n_jobs': -1}
+    else:
+        return {'workers': -1}
+
+
+def _trisection_weights(ratio, which):
+    """
+    Weights on the first and second vertex of a segment for each of the
+    trisection points selected by `which` ('both', 'near' or 'far')
+    """
+    far  = (ratio, 1.0-ratio)
+    near = (1.0-ratio, ratio)
+
+    if which == 'both':
+        return [far, near]
+    elif which == 'near':
+        return [near]
+    elif which == 'far':
+        return [far]
+    else:
+        raise ValueError("which must be 'both', 'near' or 'far'")
+
+
 def remove_duplicates(vector_tuple):
     """
     Remove duplicates rows from N equally-sized arrays
     """
-    array = np.column_stack(vector_tuple)
-    a = np.ascontiguousarray(array)
-    unique_a = np.unique(a.view([('', a.dtype)]*a.shape[1]))
-    b = unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
-    return list(b.T)
+    a = np.column_stack(vector_tuple)
+
+    # sort the rows (first column as the primary key) and keep
+    # every row that differs from the one before it
+    a = a[np.lexsort(a.T[::-1])]
+    keep = np.empty(a.shape[0], dtype=bool)
+    keep[:1] = True
+    np.any(a[1:] != a[:-1], axis=1, out=keep[1:])
+
+    return list(a[keep].T)
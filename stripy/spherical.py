@@ -20,6 +20,7 @@ along with Stripy.  If not, see <http://www.gnu.org/licenses/>.
 # -*- coding: utf-8 -*-
 from . import _stripack
 from . import _ssrfpack
+from .cartesian import _cKDtree_query_kwargs, _trisection_weights, _unique_edges, remove_duplicates
 import numpy as np
 
 try: range = xrange
@@ -127,12 +128,11 @@ class sTriangulation(object):
         """
         Create shuffle and deshuffle vectors
         """
-        i = np.arange(0, npoints)
         # permutation
         p = np.random.permutation(npoints)
         ip = np.empty_like(p)
         # inverse permutation
-        ip[p[i]] = i
+        ip[p] = np.arange(0, npoints)
         return p, ip
 
 
@@ -189,6 +189,7 @@ class sTriangulation(object):
 
         self._permutation = p
         self._invpermutation = ip
+        self._identity_perm = not self.permute
 
 
         if ierr > 0:
@@ -222,6 +223,10 @@ class sTriangulation(object):
         self._simplices = ltri.T[:nt] - 1
         ## np.ndarray.sort(self.simplices, axis=1)
 
+        self._vertex_triangle_map = None
+        self._ltri = None
+        self._segment_list = None
+
         ## If scipy is installed, build a KDtree to find neighbour points
 
         if self.tree:
@@ -263,6 +268,10 @@ class sTriangulation(object):
         Permute field
         """
 
+        if self._identity_perm:
+            fields = [np.asarray(arg) for arg in args]
+            return fields[0] if len(fields) == 1 else fields
+
         p = self._permutation
 
         fields = []
@@ -277,8 +286,13 @@ class sTriangulation(object):
     def _deshuffle_field(self, *args):
         """
         Return to original ordering
+        (always as new arrays so that stored fields are not handed out)
         """
 
+        if self._identity_perm:
+            fields = [np.array(arg) for arg in args]
+            return fields[0] if len(fields) == 1 else fields
+
         ip = self._invpermutation
 
         fields = []
@@ -294,15 +308,22 @@ class sTriangulation(object):
         """
         Permute ordering
         """
+        if self._identity_perm:
+            return np.asarray(simplices)
+
         ip = self._invpermutation
         return ip[simplices]
 
     def _deshuffle_simplices(self, simplices):
         """
         Return to original ordering
+        (always as a new array, -1 entries are kept as -1)
         """
+        if self._identity_perm:
+            return np.array(simplices, dtype=self._permutation.dtype)
+
         p = self._permutation
-        return p[simplices]
+        return np.where(np.less(simplices, 0), -1, p[simplices])
 
 
     def gradient_lonlat(self, data, nit=3, tol=1.0e-3, guarantee_convergence=False, sigma=None):
@@ -856,10 +877,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         The kth neighbour is opposite to the kth vertex.
         For simplices at the boundary, -1 denotes no neighbour.
         """
-        nt, ltri, ierr = _stripack.trlist(self.lst, self.lptr, self.lend, nrow=6)
-        if ierr != 0:
-            raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
-        return ltri.T[:nt,3:] - 1
+        return self._triangle_list()[:,3:6].copy()
 
     def neighbour_and_arc_simplices(self):
         """
@@ -867,11 +885,23 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         Identical to get_neighbour_simplices() but also returns an array
         of indices that reside on boundary hull, -1 denotes no neighbour.
         """
-        nt, ltri, ierr = _stripack.trlist(self.lst, self.lptr, self.lend, nrow=9)
-        if ierr != 0:
-            raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
-        ltri = ltri.T[:nt] - 1
-        return ltri[:,3:6], ltri[:,6:]
+        ltri = self._triangle_list()
+        return ltri[:,3:6].copy(), ltri[:,6:].copy()
+
+
+    def _triangle_list(self):
+        """
+        Zero-based triangle list from trlist with vertices, neighbour
+        simplices and arc indices in each row (nrow=9).
+        This is cached until the triangulation is updated.
+        """
+        if self._ltri is None:
+            nt, ltri, ierr = _stripack.trlist(self.lst, self.lptr, self.lend, nrow=9)
+            if ierr != 0:
+                raise ValueError('ierr={} in trlist\n{}'.format(ierr, _ier_codes[ierr]))
+            self._ltri = ltri.T[:nt] - 1
+
+        return self._ltri
 
 
     def nearest_vertex(self, lons, lats):
@@ -903,8 +933,8 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         # translate to unit sphere
 
         xi = np.array(_stripack.trans(lats, lons))
-        idx = np.empty_like(xi[0,:], dtype=np.int)
-        dist = np.empty_like(xi[0,:], dtype=np.float)
+        idx = np.empty_like(xi[0,:], dtype=np.int32)
+        dist = np.empty_like(xi[0,:], dtype=np.float64)
 
         for pt in range(0, xi.shape[1]):
             xi0 = xi[:,pt]
@@ -973,12 +1003,13 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
             That the ordering of the vertices may differ from
             that stored in the self.simplices array but will
             still be a loop around the simplex.
+            For points outside the triangulation the third vertex is -1.
         """
 
         pts = np.array(lonlat2xyz(lons,lats)).T
 
-        tri = np.empty((pts.shape[0], 3), dtype=np.int) # simplices
-        bcc = np.empty_like(tri, dtype=np.float) # barycentric coords
+        tri = np.empty((pts.shape[0], 3), dtype=np.int32) # simplices
+        bcc = np.empty_like(tri, dtype=np.float64) # barycentric coords
 
         for i, pt in enumerate(pts):
             t = _stripack.trfind(3, pt, self._x, self._y, self._z, self.lst, self.lptr, self.lend )
@@ -1020,31 +1051,73 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
         triangles = []
 
+        indptr, indices = self._vertex_triangles()
+
         for vertex in np.array(vertices).reshape(-1):
-            triangles.append(np.where(self.simplices == vertex)[0])
+            triangles.append(indices[indptr[vertex]:indptr[vertex+1]])
 
         return np.unique(np.concatenate(triangles))
 
 
+    def _vertex_triangles(self):
+        """
+        Inverted index of the triangles that own each vertex, stored in
+        compressed (indptr, indices) form so that the triangles of `vertex`
+        are `indices[indptr[vertex]:indptr[vertex+1]]`.
+        This is cached until the triangulation is updated.
+        """
+        if self._vertex_triangle_map is None:
+            flat = self.simplices.ravel()
+
+            indptr = np.zeros(self.npoints+1, dtype=np.int64)
+            indptr[1:] = np.cumsum(np.bincount(flat, minlength=self.npoints))
+            indices = np.argsort(flat, kind='stable') // 3
+
+            self._vertex_triangle_map = (indptr, indices)
+
+        return self._vertex_triangle_map
+
+
 
     def identify_segments(self):
         """
         Find all the segments in the triangulation and return an
         array of vertices (n1,n2) where n1 < n2
+        (a new array each time, the cached list is read-only)
+        """
+        segments = self._deshuffle_simplices(self._segments())
+
+        # relabelled vertex pairs are no longer in increasing order
+        if not self._identity_perm:
+            segments.sort(axis=1)
+            segments = segments[np.lexsort((segments[:,1], segments[:,0]))]
+
+        return segments
+
+
+    def _segments(self):
         """
+        Segments (zero-based, permuted ordering) of the triangulation.
+        These are cached, read-only, until the triangulation is updated.
+        """
+        if self._segment_list is not None:
+            return self._segment_list
 
         lst  = self.lst
         lend = self.lend
         lptr = self.lptr
 
-        segments_array = np.empty((len(lptr),2),dtype=np.int)
+        segments_array = np.empty((len(lptr),2),dtype=np.int32)
         segments_array[:,0] = lst[:] - 1
         segments_array[:,1] = lst[lptr[:]-1] - 1
 
         valid = np.where(segments_array[:,0] < segments_array[:,1])[0]
         segments = segments_array[valid,:]
 
-        return self._deshuffle_simplices(segments)
+        segments.flags.writeable = False
+        self._segment_list = segments
+
+        return segments
 
 
     def segment_midpoints_by_vertices(self, vertices):
@@ -1053,13 +1126,15 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         list / array provided.
         """
 
-        segments = set()
+        n1 = []
+        n2 = []
 
         for vertex in vertices:
-            neighbours = self.identify_vertex_neighbours(vertex)
-            segments.update( min( tuple((vertex, n1)), tuple((n1, vertex))) for n1 in neighbours )
+            neighbours = np.array(self.identify_vertex_neighbours(vertex), dtype=np.int64)
+            n1.append(np.minimum(vertex, neighbours))
+            n2.append(np.maximum(vertex, neighbours))
 
-        segs = np.array(list(segments))
+        segs = _unique_edges(np.concatenate(n1), np.concatenate(n2))
 
         new_midpoint_lonlats = self.segment_midpoints(segments=segs)
 
@@ -1072,11 +1147,11 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         simplices is given then the centroids of only those simplices is returned.
         """
 
-        if type(simplices) == type(None):
+        if simplices is None:
             simplices = self.simplices
 
-        mids = self.points[simplices].mean(axis=1)
-        mids /= np.linalg.norm(mids, axis=1).reshape(-1,1)
+        mids = np.take(self.points, simplices, axis=0).mean(axis=1)
+        mids /= np.sqrt(np.einsum('ij,ij->i', mids, mids)).reshape(-1,1)
 
         midlons, midlats = xyz2lonlat(mids[:,0], mids[:,1], mids[:,2])
 
@@ -1092,32 +1167,46 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         will fail. Take care not to miss that (n1,n2) is equivalent to (n2,n1).
         """
 
-        if type(segments) == type(None):
+        if segments is None:
             segments = self.identify_segments()
-        points = self.points
 
-        mids = (points[segments[:,0]] + points[segments[:,1]]) * 0.5
-        mids /= np.linalg.norm(mids, axis=1).reshape(-1,1)
+        mids = np.take(self.points, segments, axis=0).mean(axis=1)
+        mids /= np.sqrt(np.einsum('ij,ij->i', mids, mids)).reshape(-1,1)
 
         lons, lats = xyz2lonlat(mids[:,0], mids[:,1], mids[:,2])
 
         return lons, lats
 
-    def segment_tripoints(self, ratio=0.33333):
+    def segment_tripoints(self, ratio=0.33333, which='both'):
         """
         Identify the trisection points of every line segment in the triangulation
+
+        Args:
+            ratio : float (default: 0.33333)
+                fraction of the segment length at which the points are placed
+            which : str (default: 'both')
+                'near' for the point nearer the first vertex of each segment,
+                'far' for the point nearer the second vertex, or 'both' to
+                return the 'far' points followed by the 'near' points
         """
 
+        weights = _trisection_weights(ratio, which)
+
         segments = self.identify_segments()
-        points = self.points
 
-        mids1 = ratio * points[segments[:,0]] + (1.0-ratio) * points[segments[:,1]]
-        mids1 /= np.linalg.norm(mids1, axis=1).reshape(-1,1)
+        # end points of every segment, shape (n,2,3)
+        ends = np.take(self.points, segments, axis=0)
+
+        # write the requested trisection points of each segment into one buffer
+        n = segments.shape[0]
+        mids = np.empty((len(weights)*n, 3))
 
-        mids2 = (1.0-ratio) *  points[segments[:,0]] + ratio * points[segments[:,1]]
-        mids2 /= np.linalg.norm(mids2, axis=1).reshape(-1,1)
+        for i, (w0, w1) in enumerate(weights):
+            out = mids[i*n:(i+1)*n]
+            np.multiply(ends[:,0], w0, out=out)
+            out += w1 * ends[:,1]
 
-        mids = np.vstack((mids1,mids2))
+        mids /= np.sqrt(np.einsum('ij,ij->i', mids, mids)).reshape(-1,1)
 
         midlls = xyz2lonlat(mids[:,0], mids[:,1], mids[:,2])
 
@@ -1181,12 +1270,8 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         Compute the edge-lengths of each triangle in the triangulation.
         """
 
-        simplex = self.simplices.T
-
-        # simplex is vectors a, b, c defining the corners
-        a = self.points[simplex[0]]
-        b = self.points[simplex[1]]
-        c = self.points[simplex[2]]
+        # vectors a, b, c defining the corners, gathered at once
+        a, b, c = np.take(self.points, self.simplices, axis=0).transpose(1,0,2)
 
         ## dot products to obtain angles
         ab = np.arccos((a * b).sum(axis=1))
@@ -1211,21 +1296,38 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         # Call the module-level function
         return angular_separation(lonp1, latp1, lonp2, latp2)
 
+    def _append_lonlats(self, lons, lats):
+        """
+        Returns the lon, lat coordinates of the mesh (original ordering)
+        followed by `lons`, `lats`. Each is written straight into a single
+        preallocated array rather than deshuffled and concatenated.
+        """
+        n = self.npoints
+        lonv1 = np.empty(n + np.size(lons))
+        latv1 = np.empty(n + np.size(lats))
+
+        for out, field, new in ((lonv1, self._lons, lons), (latv1, self._lats, lats)):
+            if self._identity_perm:
+                out[:n] = field
+            else:
+                np.take(field, self._invpermutation, out=out[:n])
+            out[n:] = np.ravel(new)
+
+        return lonv1, latv1
+
     def _add_spherical_midpoints(self):
 
         midlon_array, midlat_array = self.segment_midpoints()
 
-        lonv2 = np.concatenate((self.lons, midlon_array), axis=0)
-        latv2 = np.concatenate((self.lats, midlat_array), axis=0)
+        lonv2, latv2 = self._append_lonlats(midlon_array, midlat_array)
 
         return lonv2, latv2
 
-    def _add_spherical_tripoints(self, ratio=0.333333):
+    def _add_spherical_tripoints(self, ratio=0.333333, which='both'):
 
-        midlon_array, midlat_array = self.segment_tripoints(ratio=ratio)
+        midlon_array, midlat_array = self.segment_tripoints(ratio=ratio, which=which)
 
-        lonv2 = np.concatenate((self.lons, midlon_array), axis=0)
-        latv2 = np.concatenate((self.lats, midlat_array), axis=0)
+        lonv2, latv2 = self._append_lonlats(midlon_array, midlat_array)
 
         return lonv2, latv2
 
@@ -1233,8 +1335,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
         facelon_array, facelat_array = self.face_midpoints()
 
-        lonv2 = np.concatenate((self.lons, facelon_array), axis=0)
-        latv2 = np.concatenate((self.lats, facelat_array), axis=0)
+        lonv2, latv2 = self._append_lonlats(facelon_array, facelat_array)
 
         return lonv2, latv2
 
@@ -1266,8 +1367,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
         mlons, mlats = self.segment_midpoints_by_vertices(vertices=vertices)
 
-        lonv1 = np.concatenate((self.lons, mlons), axis=0)
-        latv1 = np.concatenate((self.lats, mlats), axis=0)
+        lonv1, latv1 = self._append_lonlats(mlons, mlats)
 
         return lonv1, latv1
 
@@ -1291,21 +1391,14 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
         # identify the segments
 
-        simplices = self.simplices
-        segments = set()
-
-        for index in np.array(triangles).reshape(-1):
-            tri = simplices[index]
-            segments.add( min( tuple((tri[0], tri[1])), tuple((tri[1], tri[0]))) )
-            segments.add( min( tuple((tri[1], tri[2])), tuple((tri[2], tri[1]))) )
-            segments.add( min( tuple((tri[0], tri[2])), tuple((tri[2], tri[0]))) )
+        tri = np.sort(self.simplices[np.array(triangles).reshape(-1)], axis=1)
 
-        segs = np.array(list(segments))
+        segs = _unique_edges(np.concatenate([tri[:,0], tri[:,1], tri[:,0]]),
+                             np.concatenate([tri[:,1], tri[:,2], tri[:,2]]))
 
         mlons, mlats = self.segment_midpoints(segs)
 
-        lonv1 = np.concatenate((self.lons, mlons), axis=0)
-        latv1 = np.concatenate((self.lats, mlats), axis=0)
+        lonv1, latv1 = self._append_lonlats(mlons, mlats)
 
         return lonv1, latv1
 
@@ -1338,8 +1431,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
         mlons, mlats = self.face_midpoints(simplices=self.simplices[triangles])
 
-        lonv1 = np.concatenate((self.lons, mlons), axis=0)
-        latv1 = np.concatenate((self.lats, mlats), axis=0)
+        lonv1, latv1 = self._append_lonlats(mlons, mlats)
 
         return lonv1, latv1
 
@@ -1357,14 +1449,20 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
 
 
 
-    def join(self, t2, unique=False):
+    def join(self, t2, unique=None):
         """
-        Join this triangulation with another. If the points are known to have no duplicates, then
-        set unique=True to skip the testing and duplicate removal
+        Join this triangulation with another. By default the points are assumed to have
+        no duplicates (unique=True) and are not tested. Set unique=False to find and
+        remove any duplicate points.
         """
+        if unique is None:
+            import warnings
+            message = "join no longer removes duplicate points by default"
+            message += "\npass unique=False if the two point sets may overlap"
+            warnings.warn(message, FutureWarning, stacklevel=2)
+            unique = True
 
-        lonv1 = np.concatenate((self.lons, t2.lons), axis=0)
-        latv1 = np.concatenate((self.lats, t2.lats), axis=0)
+        lonv1, latv1 = self._append_lonlats(t2.lons, t2.lats)
 
         ## remove any duplicates
 
@@ -1377,11 +1475,17 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
     def _build_cKDtree(self):
 
         try:
+            import scipy
             import scipy.spatial
-            self._cKDtree =  scipy.spatial.cKDTree(self.points)
+            self._cKDtree =  scipy.spatial.cKDTree(self.points, leafsize=16,
+                                                   balanced_tree=True, compact_nodes=True)
 
         except:
             self._cKDtree = None
+            return
+
+        # queries run on every core
+        self._cKDtree_query_kwargs = _cKDtree_query_kwargs(scipy.__version__)
 
 
     def nearest_vertices(self, lon, lat, k=1, max_distance=2.0 ):
@@ -1410,7 +1514,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
                 vertices of the nearest neighbour(s)
         """
 
-        if self.tree == False or self.tree == None:
+        if not self.tree:
             return 0, 0
 
         lons = np.array(lon).reshape(-1,1)
@@ -1423,7 +1527,8 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         xyz[:,1] = y[:].reshape(-1)
         xyz[:,2] = z[:].reshape(-1)
 
-        dxyz, vertices = self._cKDtree.query(xyz, k=k, distance_upper_bound=max_distance)
+        dxyz, vertices = self._cKDtree.query(xyz, k=k, distance_upper_bound=max_distance,
+                                             **self._cKDtree_query_kwargs)
 
 
         if k == 1:   # force this to be a 2D array
@@ -1432,7 +1537,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         ## Now find the angular separation / great circle distance: dlatlon
 
 
-        vertxyz = self.points[vertices].transpose(0,2,1)
+        vertxyz = np.take(self.points, vertices, axis=0).transpose(0,2,1)
         extxyz  = np.repeat(xyz, k, axis=1).reshape(vertxyz.shape)
 
         angles = np.arccos((extxyz * vertxyz).sum(axis=1))
@@ -1482,7 +1587,7 @@ F, FX, and FY are the values and partials of a linear function which minimizes Q
         cu[:,2] = e1[:,0]*e2[:,1] - e1[:,1]*e2[:,0]
 
         # compute normal vector
-        cnorm = np.sqrt( (cu**2).sum(axis=1) )
+        cnorm = np.sqrt(np.einsum('ij,ij->i', cu, cu))
 
         coords = cu / cnorm.reshape(-1,1)
         xc, yc, zc = coords[:,0], coords[:,1], coords[:,2]
@@ -1554,12 +1659,7 @@ def remove_duplicate_lonlat(lon, lat):
     remove duplicates from an array of lon / lat points
     """
 
-    a = np.ascontiguousarray(np.vstack((lon, lat)).T)
-    unique_a = np.unique(a.view([('', a.dtype)]*a.shape[1]))
-    llunique = unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
-
-    lon1 = llunique[:,0]
-    lat1 = llunique[:,1]
+    lon1, lat1 = remove_duplicates((lon, lat))
 
     return lon1, lat1
 
@@ -1636,7 +1736,7 @@ def great_circle_Npoints(lonlat1r, lonlat2r, N):
     xyz2 = lonlat2xyz(lonlat2r[0], lonlat2r[1])
 
     mids = ratio * xyz2 + (1.0-ratio) * xyz1
-    norm = np.sqrt((mids**2).sum(axis=1))
+    norm = np.sqrt(np.einsum('ij,ij->i', mids, mids))
     xyzN = mids / norm.reshape(-1,1)
 
     lonlatN = xyz2lonlat( xyzN[:,0], xyzN[:,1], xyzN[:,2])
@@ -141,7 +141,7 @@ class triangulated_soccerball_mesh(_spherical.sTriangulation):
         base_mesh = icosahedral_mesh(refinement_levels=1, trisection=True)
         face_mesh = icosahedral_mesh(refinement_levels=0, include_face_points=True)
 
-        lons, lats = base_mesh.join(face_mesh)
+        lons, lats = base_mesh.join(face_mesh, unique=False)
 
         ll = np.vstack((lons, lats)).T
 
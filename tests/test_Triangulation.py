@@ -210,8 +210,9 @@ def test_derivative():
 
     ascending_xi = ( np.diff(dZdx_interp) > 0 ).all()
     ascending_yi = ( np.diff(dZdy_interp) > 0 ).all()
+    contiguous = dZdx.flags.c_contiguous and dZdy.flags.c_contiguous
 
-    if ascending_xi and ascending_yi:
+    if ascending_xi and ascending_yi and contiguous:
         print("PASS! (Derivatives)")
     else:
         assert False, "FAIL! (Derivatives)"
@@ -240,6 +241,230 @@ def test_smoothing():
         assert False, "FAIL! (Smoothing)"
 
 
+def test_containing_triangle():
+
+    coords = np.array([[0.0, 0.0], \
+                       [0.0, 1.0], \
+                       [1.0, 0.0], \
+                       [1.0, 1.0], \
+                       [0.5, 0.5]])
+
+    x, y = coords[:,0], coords[:,1]
+    mesh = stripy.Triangulation(x, y, permute=True)
+
+    # the centroid of every triangle, plus a point outside the mesh
+    cx, cy = mesh.face_midpoints()
+    ix = np.append(cx, 2.0)
+    iy = np.append(cy, 2.0)
+
+    tri = mesh.containing_triangle(ix, iy)
+
+    if (tri[:-1] == np.arange(mesh.simplices.shape[0])).all() and tri[-1] == -1:
+        print("PASS! (Containing triangle)")
+    else:
+        assert False, "FAIL! (Containing triangle)"
+
+
+def test_tree_ordering():
+
+    np.random.seed(0)
+    x = np.random.random(100)
+    y = np.random.random(100)
+
+    mesh = stripy.Triangulation(x, y, permute=True, tree=True)
+
+    # nodes are stored in cKDtree order but reported in the original order
+    Z = 2.0*x - y
+    ix = mesh.face_midpoints()[0]
+    iy = mesh.face_midpoints()[1]
+
+    Zi, ierr = mesh.interpolate_linear(ix, iy, Z)
+
+    if (mesh.x == x).all() and (mesh.y == y).all() and np.allclose(Zi, 2.0*ix - iy):
+        print("PASS! (Tree ordering)")
+    else:
+        assert False, "FAIL! (Tree ordering)"
+
+
+def test_tree_neighbour_simplices():
+
+    np.random.seed(1)
+    x = np.random.random(200)
+    y = np.random.random(200)
+
+    mesh = stripy.Triangulation(x, y, tree=True)
+
+    # the kth neighbour shares the edge opposite the kth vertex
+    simplices = mesh.simplices
+    neighbours = mesh.neighbour_simplices()
+
+    consistent = True
+    for i, tri in enumerate(simplices):
+        for k in range(3):
+            j = neighbours[i,k]
+            if j == -1:
+                continue
+            edge = set(tri) - {tri[k]}
+            if not edge.issubset(simplices[j]):
+                consistent = False
+
+    # the triangles are in the same order as without the tree
+    plain = stripy.Triangulation(x, y, tree=False)
+    same_order = (plain.simplices == simplices).all() and \
+                 (plain.neighbour_simplices() == neighbours).all() and \
+                 (plain.convex_hull() == mesh.convex_hull()).all()
+
+    if consistent and same_order and (neighbours >= 0).any():
+        print("PASS! (Tree neighbour simplices)")
+    else:
+        assert False, "FAIL! (Tree neighbour simplices)"
+
+
+def test_stored_fields_are_copies():
+
+    np.random.seed(2)
+    x = np.random.random(50)
+    y = np.random.random(50)
+
+    mesh = stripy.Triangulation(x, y, permute=False)
+    simplices = mesh.simplices.copy()
+
+    # editing the returned arrays must not touch the triangulation
+    mesh.x[:] = 0.0
+    mesh.simplices.sort(axis=1)
+
+    # identify_segments returns a writable copy of the cached segments
+    segments = mesh.identify_segments()
+    segments[:] = segments[::-1]
+    same_segments = (mesh.identify_segments() == segments[::-1]).all()
+
+    # exterior points are labelled the same way with or without permute
+    bcc, tri = mesh.containing_simplex_and_bcc([2.0], [2.0])
+    pmesh = stripy.Triangulation(x, y, permute=True)
+    pbcc, ptri = pmesh.containing_simplex_and_bcc([2.0], [2.0])
+
+    if (mesh.x == x).all() and (mesh.simplices == simplices).all() and \
+       tri[0,2] == -1 and ptri[0,2] == -1 and (bcc[0] == 0.0).all() and \
+       same_segments:
+        print("PASS! (Stored fields are copies)")
+    else:
+        assert False, "FAIL! (Stored fields are copies)"
+
+
+def test_edge_refine_triangles():
+
+    coords = np.array([[0.0, 0.0], \
+                       [0.0, 1.0], \
+                       [1.0, 0.0], \
+                       [1.0, 1.0], \
+                       [0.5, 0.5]])
+
+    x, y = coords[:,0], coords[:,1]
+    mesh = stripy.Triangulation(x, y, permute=True)
+
+    # refining every triangle adds each segment midpoint exactly once
+    triangles = np.arange(mesh.simplices.shape[0])
+    xi, yi = mesh.edge_refine_triangulation_by_triangles(triangles)
+    nsegments = mesh.identify_segments().shape[0]
+
+    if xi.size == mesh.npoints + nsegments and yi.size == mesh.npoints + nsegments:
+        print("PASS! (Edge refinement by triangles)")
+    else:
+        assert False, "FAIL! (Edge refinement by triangles)"
+
+
+def test_edge_lengths():
+
+    coords = np.array([[0.0, 0.0], \
+                       [0.0, 1.0], \
+                       [1.0, 0.0], \
+                       [1.0, 1.0], \
+                       [0.5, 0.5]])
+
+    x, y = coords[:,0], coords[:,1]
+    mesh = stripy.Triangulation(x, y, permute=True)
+
+    ab, bc, ac = mesh.edge_lengths()
+
+    a, b, c = mesh.points[mesh.simplices].transpose(1,0,2)
+    length = lambda u: np.hypot(u[:,0], u[:,1])
+
+    if np.allclose(ab, length(b - a)) and np.allclose(bc, length(c - b)) and np.allclose(ac, length(a - c)):
+        print("PASS! (Edge lengths)")
+    else:
+        assert False, "FAIL! (Edge lengths)"
+
+
+def test_convex_hull():
+
+    from scipy.spatial import ConvexHull
+
+    np.random.seed(1)
+    x = np.random.random(200)
+    y = np.random.random(200)
+
+    mesh = stripy.Triangulation(x, y, permute=True)
+
+    hull = ConvexHull(np.column_stack([x, y]))
+
+    if set(mesh.convex_hull()) == set(hull.vertices):
+        print("PASS! (Convex hull)")
+    else:
+        assert False, "FAIL! (Convex hull)"
+
+
+def test_join():
+
+    coords = np.array([[0.0, 0.0], \
+                       [0.0, 1.0], \
+                       [1.0, 0.0], \
+                       [1.0, 1.0], \
+                       [0.5, 0.5]])
+
+    x, y = coords[:,0], coords[:,1]
+    mesh = stripy.Triangulation(x, y)
+
+    # duplicates are only tested for and removed with unique=False
+    xu, yu = mesh.join(mesh, unique=False)
+    xj, yj = mesh.join(mesh, unique=True)
+
+    with pytest.warns(FutureWarning):
+        xd, yd = mesh.join(mesh)
+
+    if xu.size == mesh.npoints and xj.size == 2*mesh.npoints and xd.size == 2*mesh.npoints:
+        print("PASS! (Join)")
+    else:
+        assert False, "FAIL! (Join)"
+
+
+def test_segment_tripoints():
+
+    coords = np.array([[0.0, 0.0], \
+                       [0.0, 1.0], \
+                       [1.0, 0.0], \
+                       [1.0, 1.0], \
+                       [0.5, 0.5]])
+
+    x, y = coords[:,0], coords[:,1]
+    mesh = stripy.Triangulation(x, y, permute=True)
+
+    segments = mesh.identify_segments()
+    p0 = mesh.points[segments[:,0]]
+
+    nx, ny = mesh.segment_tripoints(ratio=0.25, which='near')
+    fx, fy = mesh.segment_tripoints(ratio=0.25, which='far')
+    bx, by = mesh.segment_tripoints(ratio=0.25)
+
+    # the 'near' point lies a quarter of the way along each segment
+    near = p0 + 0.25*(mesh.points[segments[:,1]] - p0)
+
+    if np.allclose(nx, near[:,0]) and np.allclose(ny, near[:,1]) and \
+       (bx == np.concatenate([fx, nx])).all() and (by == np.concatenate([fy, ny])).all():
+        print("PASS! (Segment tripoints)")
+    else:
+        assert False, "FAIL! (Segment tripoints)"
+
+
 if __name__ == "__main__":
     test_derivative()
     test_nearest_nd_interpolation()
@@ -248,3 +473,12 @@ if __name__ == "__main__":
     test_cubic_interpolation_tension()
     test_cubic_interpolation_grid()
     test_smoothing()
+    test_containing_triangle()
+    test_tree_ordering()
+    test_tree_neighbour_simplices()
+    test_stored_fields_are_copies()
+    test_edge_refine_triangles()
+    test_edge_lengths()
+    test_convex_hull()
+    test_join()
+    test_segment_tripoints()